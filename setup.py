@@ -13,10 +13,14 @@ setup(
     packages=find_packages(),
     install_requires=[
         "requests>=2.25.0",
+        "urllib3>=1.26",
         "matplotlib>=3.3.0",
         "pandas>=1.0.0",
         "numpy>=1.19.0",
     ],
+    extras_require={
+        "fast": ["orjson>=3.0", "ijson>=3.0"],
+    },
     entry_points={
         "console_scripts": [
             "smtp2go-usage=smtp2go_usage.main:main",
@@ -2,33 +2,150 @@
 
 This module handles all communication with the SMTP2GO API.
 """
+import os
+import json
+import time
+import calendar
+import hashlib
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
+from urllib3.util.retry import Retry
+from datetime import datetime
 import logging
 
+# orjson is optional; it parses large API responses much faster than json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ijson is optional; it lets email history be parsed while it downloads
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 logger = logging.getLogger(__name__)
 
+class _RecordingReader:
+    """File-like wrapper that keeps a copy of the bytes read from a stream.
+    
+    Set copy to None to stop recording once the copy is no longer needed.
+    """
+    
+    __slots__ = ('raw', 'copy')
+    
+    def __init__(self, raw):
+        self.raw = raw
+        self.copy = bytearray()
+    
+    def read(self, size=-1):
+        chunk = self.raw.read(size)
+        if self.copy is not None:
+            self.copy += chunk
+        return chunk
+
 class SMTP2GoClient:
     """Client for interacting with the SMTP2GO API."""
     
     BASE_URL = "https://api.smtp2go.com/v3"
     
-    def __init__(self, api_key):
+    # (connect, read) timeouts in seconds for API requests
+    REQUEST_TIMEOUT = (5, 30)
+    
+    # How long a cached SMTP user list stays valid, in seconds
+    USER_CACHE_TTL = 24 * 60 * 60
+    
+    def __init__(self, api_key, cache_dir=None):
         """Initialize the SMTP2GO API client.
         
         Args:
             api_key (str): SMTP2GO API key for authentication
+            cache_dir (str, optional): Directory for caching the SMTP user list.
+                Caching is disabled if not provided.
         """
         self.api_key = api_key
+        self.cache_dir = cache_dir
         self.headers = {
             "X-Smtp2go-Api-Key": api_key,
             "Content-Type": "application/json"
         }
+        
+        # Reuse one keep-alive connection pool for all API calls so that
+        # subsequent requests skip the TCP and TLS handshakes. The session is
+        # shared by the threads that overlap independent calls; its urllib3
+        # pool hands each concurrent request its own connection. The API only
+        # uses POST for read-only queries, so it is safe to retry them.
+        self._session = requests.Session()
+        self._session.headers.update(self.headers)
+        self._session.headers["Connection"] = "keep-alive"
+        adapter = HTTPAdapter(
+            pool_connections=2,
+            pool_maxsize=4,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=None
+            )
+        )
+        self._session.mount("https://", adapter)
+    
+    def close(self):
+        """Close the client's pooled API connections."""
+        self._session.close()
+    
+    @classmethod
+    def batch_report(cls, jobs, max_workers=8):
+        """Get email history for several accounts concurrently.
+        
+        Each job runs in a worker thread with its own client, since the API
+        key is part of each client's session headers.
+        
+        Args:
+            jobs (list): (api_key, start_date, end_date) tuples
+            max_workers (int): Maximum number of concurrent API requests
+            
+        Returns:
+            list: Email history data for each job, in the order of jobs
+        """
+        def run(job):
+            api_key, start_date, end_date = job
+            client = cls(api_key)
+            try:
+                return client.get_email_history_by_user(start_date, end_date)
+            finally:
+                client.close()
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(run, jobs))
     
         
     def get_smtp_users(self):
         """Retrieve all SMTP users.
         
+        The user list rarely changes, so when a cache directory is configured
+        it is served from disk for up to USER_CACHE_TTL seconds.
+        
+        Returns:
+            list: List of SMTP user information
+        """
+        users = self._read_user_cache()
+        if users is not None:
+            logger.info(f"Using {len(users)} cached SMTP users")
+            return users
+        
+        users = self._fetch_smtp_users()
+        if users:
+            self._write_user_cache(users)
+        return users
+    
+    def _fetch_smtp_users(self):
+        """Retrieve all SMTP users from the API.
+        
         Returns:
             list: List of SMTP user information
         """
@@ -40,24 +157,74 @@ class SMTP2GoClient:
         if not response:
             return []
         
-        # Check the actual response structure  
-        logger.debug(f"Full SMTP users response: {response}")
+        # Check the actual response structure
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Full SMTP users response: %s", response)
         
-        # The API returns data.results structure based on logs
-        if 'data' in response and 'results' in response['data']:
-            users = response['data'].get('results', [])
-            logger.info(f"Found {len(users)} SMTP users in API response")
-            return users
-            
-        # Fallback to other possible structures if available
-        if 'results' in response:
-            users = response.get('results', [])
-            logger.info(f"Found {len(users)} SMTP users directly in response")
-            return users
-            
-        # Final fallback
-        return response.get("data", {}).get("users", [])
+        # The API returns a data.results structure; fall back to the other
+        # structures it has been seen to use
+        # Keys are checked for presence, so an empty data.results is kept
+        data = response.get('data') or {}
+        if 'results' in data:
+            users = data['results']
+        elif 'results' in response:
+            users = response['results']
+        else:
+            users = data.get('users', [])
+        logger.info("Found %d SMTP users in API response", len(users))
+        return users
+    
+    def _user_cache_path(self):
+        """Get the cache file path for this API key's SMTP user list.
+        
+        Returns:
+            str: Path to the cache file or None if caching is disabled
+        """
+        if not self.cache_dir:
+            return None
+        
+        # Key the cache on a hash so the API key never ends up on disk
+        key = hashlib.sha256(self.api_key.encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"smtp_users_{key}.json")
+    
+    def _read_user_cache(self):
+        """Read the SMTP user list from the cache if it is still fresh.
+        
+        Returns:
+            list: Cached SMTP users or None if missing, expired or unreadable
+        """
+        cache_path = self._user_cache_path()
+        if not cache_path:
+            return None
+        
+        try:
+            with open(cache_path, 'r') as f:
+                cached = json.load(f)
+            if time.time() - cached["timestamp"] < self.USER_CACHE_TTL:
+                return cached["users"]
+            logger.info("Cached SMTP user list has expired")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable SMTP user cache {cache_path}: {e}")
+        return None
     
+    def _write_user_cache(self, users):
+        """Write the SMTP user list to the cache.
+        
+        Args:
+            users (list): SMTP user information to cache
+        """
+        cache_path = self._user_cache_path()
+        if not cache_path:
+            return
+        
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(cache_path, 'w') as f:
+                json.dump({"timestamp": time.time(), "users": users}, f)
+        except OSError as e:
+            logger.warning(f"Failed to write SMTP user cache {cache_path}: {e}")
         
     def get_email_history_by_user(self, start_date, end_date):
         """Get email history for the specified date range, grouped by username.
@@ -71,9 +238,9 @@ class SMTP2GoClient:
         """
         endpoint = f"{self.BASE_URL}/stats/email_history"
         
-        # Format dates for API
-        start_iso = start_date.strftime("%Y-%m-%dT%H:%M:%S%z")
-        end_iso = end_date.strftime("%Y-%m-%dT%H:%M:%S%z")
+        # Format dates for API as ISO-8601 (an offset is only included for aware datetimes)
+        start_iso = start_date.isoformat(timespec='seconds')
+        end_iso = end_date.isoformat(timespec='seconds')
         
         payload = {
             "group_by": "username",  # API requires "username" not "user"
@@ -81,77 +248,162 @@ class SMTP2GoClient:
             "end_date": end_iso
         }
             
-        response = self._make_request(endpoint, payload)
+        if ijson is not None:
+            # Convert data.history entries as they are parsed rather than
+            # materializing the whole response first
+            streamed = self._stream_history_stats(endpoint, payload)
+            if streamed is None:
+                return {}
+            stats, response = streamed
+        else:
+            stats, response = None, self._make_request(endpoint, payload)
         
-        if not response:
-            return {}
-        
-        # Log the complete response structure for debugging
-        logger.debug(f"Full email history response: {response}")
-        
-        # Check for nested data structure first
-        if 'data' in response and 'history' in response['data']:
-            history = response['data'].get('history', [])
-            stats = []
-            
-            # Based on the log output, the structure seems to be different
-            for entry in history:
-                username = entry.get('username', 'Unknown')
-                # Direct values from the history record
-                sent = entry.get('used', 0)  # 'used' seems to be the sent count from logs
-                bounces = entry.get('bounces', 0)
-                rejects = entry.get('rejects', 0)
-                
-                # Calculate delivered and failed emails
-                failed = bounces + rejects
-                delivered = sent - failed
-                
-                logger.debug(f"User {username}: sent={sent}, delivered={delivered}, failed={failed}")
+        if stats is None:
+            if not response:
+                return {}
+            
+            # Log the complete response structure for debugging
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Full email history response: %s", response)
+            
+            # Check for nested data structure first, then the direct structure
+            history = (response.get('data') or {}).get('history')
+            if history is None:
+                history = response.get('history')
+            
+            if history is None:
+                # Fallback to the original expected structure
+                return response.get("data", {})
+            
+            stats = self._history_to_stats(history)
+        
+        logger.info("Processed %d user email statistics from API response", len(stats))
+        if stats and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("First user statistics sample: %r", stats[0])
+        return {"stats": stats}
+
+    def _stream_history_stats(self, endpoint, payload):
+        """Stream an email history response into per-user statistics.
+        
+        Entries of data.history are converted as they are parsed, so the raw
+        response is never held in memory as a whole. Responses without any
+        data.history entries are decoded in full instead, so that callers can
+        handle them like a regular response.
+        
+        Args:
+            endpoint (str): API endpoint to call
+            payload (dict): Request payload
+            
+        Returns:
+            tuple: (stats, response) where stats is the list of per-user
+                statistics and response is None, or stats is None and
+                response is the decoded response; None on error
+        """
+        logger.info(f"Making streaming API request to: {endpoint}")
+        logger.info(f"API payload: {payload}")
+        
+        try:
+            with self._session.post(
+                endpoint,
+                json=payload,
+                timeout=self.REQUEST_TIMEOUT,
+                stream=True
+            ) as response:
+                logger.info(f"API response status code: {response.status_code}")
                 
-                stats.append({
-                    'username': username,
-                    'sent': sent,
-                    'delivered': delivered,
-                    'failed': failed
-                })
-            
-            logger.info(f"Processed {len(stats)} user email statistics from API response")
-            # Print the results for debugging
-            if stats:
-                logger.info(f"First user statistics sample: {stats[0]}")
-            return {"stats": stats}
-        
-        # Fallback to direct structure
-        if 'history' in response:
-            history = response.get('history', [])
-            stats = []
-            
-            # Same processing as above
-            for entry in history:
-                username = entry.get('username', 'Unknown')
-                sent = entry.get('used', 0)
-                bounces = entry.get('bounces', 0)
-                rejects = entry.get('rejects', 0)
+                response.raise_for_status()
+                # Have urllib3 undo any gzip/deflate encoding as it streams
+                response.raw.decode_content = True
+                # Keep the body until the first history entry arrives in case
+                # the response uses another structure
+                body = _RecordingReader(response.raw)
                 
-                failed = bounces + rejects
-                delivered = sent - failed
+                def entries():
+                    for entry in ijson.items(body, 'data.history.item'):
+                        body.copy = None
+                        yield entry
                 
-                logger.debug(f"User {username}: sent={sent}, delivered={delivered}, failed={failed}")
+                stats = self._history_to_stats(entries())
+                if stats:
+                    logger.info(f"API returned {len(stats)} history records")
+                    return stats, None
                 
-                stats.append({
-                    'username': username,
-                    'sent': sent,
-                    'delivered': delivered,
-                    'failed': failed
-                })
-            
-            logger.info(f"Processed {len(stats)} user email statistics from API response")
-            if stats:
-                logger.info(f"First user statistics sample: {stats[0]}")
-            return {"stats": stats}
-        
-        # Fallback to the original expected structure
-        return response.get("data", {})
+                response_data = orjson.loads(body.copy) if orjson is not None else json.loads(body.copy)
+                self._log_response_summary(response_data)
+                return None, response_data
+            
+        except (requests.exceptions.RequestException, Urllib3HTTPError, ijson.JSONError, ValueError) as e:
+            logger.error(f"API request failed: {e}")
+            return None
+
+    @staticmethod
+    def _history_to_stats(history):
+        """Convert email history records into per-user statistics.
+        
+        Args:
+            history (list): History records from the email_history endpoint
+            
+        Returns:
+            list: Statistics with username, sent, delivered and failed counts
+        """
+        stats = []
+        debug = logger.isEnabledFor(logging.DEBUG)
+        
+        for entry in history:
+            username = entry.get('username', 'Unknown')
+            # Direct values from the history record
+            sent = entry.get('used', 0)  # 'used' seems to be the sent count from logs
+            bounces = entry.get('bounces', 0)
+            rejects = entry.get('rejects', 0)
+            
+            # Calculate delivered and failed emails
+            failed = bounces + rejects
+            delivered = sent - failed
+            
+            if debug:
+                logger.debug("User %s: sent=%s, delivered=%s, failed=%s", username, sent, delivered, failed)
+            
+            stats.append({
+                'username': username,
+                'sent': sent,
+                'delivered': delivered,
+                'failed': failed
+            })
+        
+        return stats
+
+    @staticmethod
+    def _parse(response):
+        """Decode the JSON body of an API response.
+        
+        Args:
+            response (requests.Response): Successful API response
+            
+        Returns:
+            dict: Decoded response data
+        """
+        if orjson is not None:
+            # Parse straight from the raw bytes without decoding to str first
+            return orjson.loads(response.content)
+        return response.json()
+
+    @staticmethod
+    def _log_response_summary(response_data):
+        """Log the structure of an API response without too much detail.
+        
+        Args:
+            response_data (dict): Decoded response data
+        """
+        data = response_data.get('data')
+        if isinstance(data, dict):
+            if 'stats' in data:
+                logger.info(f"API returned {len(data['stats'])} stat records")
+            elif 'subaccounts' in data:
+                logger.info(f"API returned {len(data['subaccounts'])} subaccounts")
+            else:
+                logger.info(f"API returned data with keys: {list(data.keys())}")
+        else:
+            logger.info(f"API response keys: {list(response_data.keys())}")
 
     def _make_request(self, endpoint, payload):
         """Make a request to the SMTP2GO API.
@@ -167,30 +419,20 @@ class SMTP2GoClient:
         logger.info(f"API payload: {payload}")
         
         try:
-            response = requests.post(
+            response = self._session.post(
                 endpoint,
-                headers=self.headers,
-                json=payload
+                json=payload,
+                timeout=self.REQUEST_TIMEOUT
             )
             logger.info(f"API response status code: {response.status_code}")
             
             response.raise_for_status()
-            response_data = response.json()
-            
-            # Log the response (but keep it secure by not showing too much detail)
-            if 'data' in response_data:
-                if 'stats' in response_data['data']:
-                    logger.info(f"API returned {len(response_data['data']['stats'])} stat records")
-                elif 'subaccounts' in response_data['data']:
-                    logger.info(f"API returned {len(response_data['data']['subaccounts'])} subaccounts")
-                else:
-                    logger.info(f"API returned data with keys: {list(response_data['data'].keys())}")
-            else:
-                logger.info(f"API response keys: {list(response_data.keys())}")
+            response_data = self._parse(response)
             
+            self._log_response_summary(response_data)
             return response_data
             
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, ValueError) as e:
             logger.error(f"API request failed: {e}")
             if 'response' in locals():
                 try:
@@ -208,15 +450,30 @@ class SMTP2GoClient:
         """
         today = datetime.now()
         
-        # Get the first day of the current month
-        first_of_current = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        # Get the last day of the previous month (1 day before first of current month)
-        last_of_previous = first_of_current - timedelta(days=1)
+        # Step back one month, wrapping January to December of the prior year
+        if today.month > 1:
+            year, month = today.year, today.month - 1
+        else:
+            year, month = today.year - 1, 12
         
-        # Get the first day of the previous month
-        first_of_previous = last_of_previous.replace(day=1)
+        first_of_previous, last_of_previous = _month_range(year, month)
         
         logger.info(f"Using previous month date range: {first_of_previous.strftime('%Y-%m-%d')} to {last_of_previous.strftime('%Y-%m-%d')}")
         
-        return first_of_previous, last_of_previous
\ No newline at end of file
+        return first_of_previous, last_of_previous
+
+
+@functools.lru_cache(maxsize=64)
+def _month_range(year, month):
+    """Calculate the date range covering a calendar month.
+    
+    Args:
+        year (int): Year of the month
+        month (int): Month number (1-12)
+        
+    Returns:
+        tuple: (start_date, end_date) as datetime objects at midnight on the
+            first and last day of the month
+    """
+    last_day = calendar.monthrange(year, month)[1]
+    return datetime(year, month, 1), datetime(year, month, last_day)
\ No newline at end of file
@@ -3,19 +3,36 @@
 This module handles loading and validating configuration settings.
 """
 import os
-import json
 import logging
-import argparse
+import functools
 from pathlib import Path
 
+# json, orjson and argparse are imported where they are used so that importing
+# this module stays cheap for callers that never touch a config file or the CLI
+
 logger = logging.getLogger(__name__)
 
 class Config:
     """Configuration manager for the application."""
     
+    # All settings live in the config dict; no per-instance __dict__ is needed
+    __slots__ = ("config",)
+    
     # Default config path (kept for backwards compatibility)
     DEFAULT_CONFIG_PATH = os.path.expanduser("~/.smtp2go-usage/config.json")
     
+    # Mapping of environment variables to config keys
+    ENV_MAPPING = {
+        "SMTP2GO_API_KEY": "api_key",
+        "SMTP2GO_SMTP_SERVER": "smtp_server",
+        "SMTP2GO_SMTP_PORT": "smtp_port",
+        "SMTP2GO_SMTP_USERNAME": "smtp_username",
+        "SMTP2GO_SMTP_PASSWORD": "smtp_password",
+        "SMTP2GO_SENDER_EMAIL": "sender_email",
+        "SMTP2GO_REPORT_RECIPIENTS": "report_recipients",
+        "SMTP2GO_REPORT_DIR": "report_dir"
+    }
+    
     def __init__(self):
         """Initialize the configuration manager."""
         self.config = {
@@ -50,10 +67,18 @@ class Config:
         if not config_file:
             logger.info("No config file specified. Using environment variables instead.")
             return False
+        
+        import json
+        orjson = _import_orjson()
             
         try:
-            with open(config_file, 'r') as f:
-                loaded_config = json.load(f)
+            if orjson is not None:
+                # orjson.JSONDecodeError subclasses json.JSONDecodeError
+                with open(config_file, 'rb') as f:
+                    loaded_config = orjson.loads(f.read())
+            else:
+                with open(config_file, 'r') as f:
+                    loaded_config = json.load(f)
                 
             # Update config with loaded values
             self.config.update(loaded_config)
@@ -81,10 +106,14 @@ class Config:
         """
         file_path = config_file or self.DEFAULT_CONFIG_PATH
         
+        import json
+        
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
         
         try:
+            # Always written with json: orjson only supports an indent of 2,
+            # and the file should look the same whichever is installed
             with open(file_path, 'w') as f:
                 json.dump(self.config, f, indent=4)
                 
@@ -94,30 +123,23 @@ class Config:
             logger.error(f"Error saving configuration: {e}")
             return False
     
-    def update_from_env(self):
+    def update_from_env(self, environ=None):
         """Update configuration from environment variables.
         
         Environment variables take precedence over configuration file values.
         
+        Args:
+            environ (dict, optional): Mapping to read variables from instead
+                of os.environ
+                
         Returns:
             bool: True if any configuration was updated, False otherwise
         """
         updated = False
         
-        # Mapping of environment variables to config keys
-        env_mapping = {
-            "SMTP2GO_API_KEY": "api_key",
-            "SMTP2GO_SMTP_SERVER": "smtp_server",
-            "SMTP2GO_SMTP_PORT": "smtp_port",
-            "SMTP2GO_SMTP_USERNAME": "smtp_username",
-            "SMTP2GO_SMTP_PASSWORD": "smtp_password",
-            "SMTP2GO_SENDER_EMAIL": "sender_email",
-            "SMTP2GO_REPORT_RECIPIENTS": "report_recipients",
-            "SMTP2GO_REPORT_DIR": "report_dir"
-        }
-        
-        for env_var, config_key in env_mapping.items():
-            value = os.environ.get(env_var)
+        env = os.environ if environ is None else environ
+        for env_var, config_key in self.ENV_MAPPING.items():
+            value = env.get(env_var)
             if value is not None:
                 # Handle special cases for conversion
                 if config_key == "smtp_port":
@@ -183,11 +205,16 @@ class Config:
             return False
         
         # Ensure report_recipients is a list with at least one recipient
-        if not isinstance(self.config.get("report_recipients"), list) or not self.config.get("report_recipients"):
+        recipients = self.config.get("report_recipients")
+        if not isinstance(recipients, (list, tuple)) or not recipients:
             logger.error("No report recipients specified")
             logger.error("Please set SMTP2GO_REPORT_RECIPIENTS in your environment file")
             return False
         
+        # Freeze the validated recipients so senders need not re-check them
+        # and can cache the formatted To header
+        self.config["report_recipients"] = tuple(recipients)
+        
         return True
     
     def get(self, key, default=None):
@@ -215,37 +242,67 @@ class Config:
     def setup_argparse():
         """Set up command-line argument parsing.
         
+        The parser is built once and shared between calls.
+        
         Returns:
             argparse.ArgumentParser: Configured argument parser
         """
-        parser = argparse.ArgumentParser(description="SMTP2GO Monthly Usage Reporter")
-        
-        parser.add_argument("-c", "--config-file", 
-                          help="Path to configuration file (optional)")
-        
-        parser.add_argument("--api-key", 
-                          help="SMTP2GO API key")
-        
-        parser.add_argument("--smtp-server", 
-                          help="SMTP server for sending reports")
-        
-        parser.add_argument("--smtp-port", type=int,
-                          help="SMTP port for sending reports")
-        
-        parser.add_argument("--smtp-username", 
-                          help="SMTP username for sending reports")
-        
-        parser.add_argument("--smtp-password", 
-                          help="SMTP password for sending reports")
-        
-        parser.add_argument("--sender-email", 
-                          help="Sender email address for reports")
-        
-        parser.add_argument("--report-recipients", 
-                          help="Comma-separated list of email addresses to send reports to")
-        
-        parser.add_argument("--report-dir", 
-                          help="Directory to save generated PDF reports")
-        
-        
-        return parser
\ No newline at end of file
+        return _build_parser()
+
+
+def _import_orjson():
+    """Import orjson if it is installed.
+    
+    Returns:
+        module: The orjson module or None to fall back to json
+    """
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+@functools.lru_cache(maxsize=1)
+def _build_parser():
+    """Build the command-line argument parser.
+    
+    Returns:
+        argparse.ArgumentParser: Configured argument parser
+    """
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="SMTP2GO Monthly Usage Reporter")
+    
+    parser.add_argument("-c", "--config-file", 
+                      help="Path to configuration file (optional)")
+    
+    parser.add_argument("--api-key", 
+                      help="SMTP2GO API key")
+    
+    parser.add_argument("--smtp-server", 
+                      help="SMTP server for sending reports")
+    
+    parser.add_argument("--smtp-port", type=int,
+                      help="SMTP port for sending reports")
+    
+    parser.add_argument("--smtp-username", 
+                      help="SMTP username for sending reports")
+    
+    parser.add_argument("--smtp-password", 
+                      help="SMTP password for sending reports")
+    
+    parser.add_argument("--sender-email", 
+                      help="Sender email address for reports")
+    
+    parser.add_argument("--report-recipients", 
+                      help="Comma-separated list of email addresses to send reports to")
+    
+    parser.add_argument("--report-dir", 
+                      help="Directory to save generated PDF reports")
+    
+    parser.add_argument("-v", "--verbose", action="store_true",
+                      help="Enable debug logging")
+    
+    
+    return parser
\ No newline at end of file
@@ -3,10 +3,36 @@
 This module processes and organizes usage data from the SMTP2GO API.
 """
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Shared fallback for stats whose username has no matching SMTP user
+_EMPTY_USER = {'name': '', 'email': ''}
+
+# Below this many users the NumPy conversion costs more than it saves
+_NUMPY_MIN_USERS = 256
+
+def _reduce_stats(sent, delivered, failed):
+    """Compute totals and per-user delivery rates from per-user count arrays.
+    
+    Args:
+        sent (numpy.ndarray): Emails sent per user
+        delivered (numpy.ndarray): Emails delivered per user
+        failed (numpy.ndarray): Emails failed per user
+        
+    Returns:
+        tuple: (total_sent, total_delivered, total_failed, rates) where rates
+            is the delivery percentage per user, 0 where nothing was sent
+    """
+    rates = np.zeros(sent.shape[0], dtype=np.float64)
+    np.divide(delivered, sent, out=rates, where=sent > 0)
+    rates *= 100
+    
+    return int(sent.sum()), int(delivered.sum()), int(failed.sum()), rates
+
 class DataProcessor:
     """Process and organize SMTP2GO usage data."""
     
@@ -33,25 +59,29 @@ class DataProcessor:
             start_date, end_date = self.api_client.get_previous_month_range()
             logger.info(f"Using date range: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
             
-        # Get all SMTP users
-        logger.info("Retrieving all SMTP users from API")
-        user_list = self.api_client.get_smtp_users()
+        # The user list and the email history are independent API calls, so
+        # issue them concurrently rather than paying for both round-trips.
+        # Both share the client's keep-alive session.
+        logger.info("Retrieving all SMTP users and email history grouped by username from API")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            users_future = executor.submit(self.api_client.get_smtp_users)
+            history_future = executor.submit(
+                self.api_client.get_email_history_by_user,
+                start_date,
+                end_date
+            )
+            user_list = users_future.result()
+            email_history = history_future.result()
         
         if not user_list:
             logger.warning("No SMTP users returned from API")
         else:
             logger.info(f"Retrieved {len(user_list)} SMTP users")
             # Log user details for debugging
-            for user in user_list:
-                logger.debug(f"SMTP User: {user.get('username', 'Unnamed')}")
+            if logger.isEnabledFor(logging.DEBUG):
+                for user in user_list:
+                    logger.debug("SMTP User: %s", user.get('username', 'Unnamed'))
             
-        # Get email history data by user
-        logger.info(f"Retrieving email history grouped by username")
-        email_history = self.api_client.get_email_history_by_user(
-            start_date, 
-            end_date
-        )
-        
         if not email_history:
             logger.warning("No email history data returned from API")
             
@@ -85,43 +115,83 @@ class DataProcessor:
         Returns:
             dict: Processed report data
         """
-        # Create mapping of usernames to user info
-        username_map = {user.get('username'): user for user in user_list}
+        # Create mapping of usernames to user info, skipping malformed users
+        # that would otherwise collide under a None key
+        username_map = {user['username']: user for user in user_list if 'username' in user}
         
         # Extract statistics by user
         user_stats = email_history.get('stats', [])
-        logger.debug(f"Processing user stats: {user_stats}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Processing user stats: %s", user_stats)
         
-        # Calculate total emails sent
-        total_sent = sum(stat.get('sent', 0) for stat in user_stats)
-        total_delivered = sum(stat.get('delivered', 0) for stat in user_stats)
-        total_failed = sum(stat.get('failed', 0) for stat in user_stats)
+        if len(user_stats) > _NUMPY_MIN_USERS:
+            total_sent, total_delivered, total_failed, formatted_stats = \
+                self._aggregate_user_stats_numpy(user_stats, username_map)
+        else:
+            total_sent, total_delivered, total_failed, formatted_stats = \
+                self._aggregate_user_stats(user_stats, username_map)
         
         logger.info(f"Total stats: sent={total_sent}, delivered={total_delivered}, failed={total_failed}")
         
         # Calculate delivery rate
         delivery_rate = (total_delivered / total_sent * 100) if total_sent > 0 else 0
         
-        # Format user stats
+        # Create report data structure
+        report_data = {
+            'report_period': {
+                'start_date': start_date,
+                'end_date': end_date,
+                'formatted': f"{start_date.strftime('%B %d, %Y')} - {end_date.strftime('%B %d, %Y')}"
+            },
+            'summary': {
+                'total_sent': total_sent,
+                'total_delivered': total_delivered,
+                'total_failed': total_failed,
+                'delivery_rate': delivery_rate,
+                'total_users': len(formatted_stats)
+            },
+            'users': formatted_stats,
+            'generated_at': datetime.now()
+        }
+        
+        return report_data
+    
+    def _aggregate_user_stats(self, user_stats, username_map):
+        """Accumulate totals and format per-user stats in a single pass.
+        
+        Args:
+            user_stats (list): Per-user statistics from the API
+            username_map (dict): Mapping of usernames to SMTP user info
+            
+        Returns:
+            tuple: (total_sent, total_delivered, total_failed, formatted_stats)
+                with formatted_stats sorted by emails sent (descending)
+        """
+        total_sent = total_delivered = total_failed = 0
         formatted_stats = []
+        append = formatted_stats.append
         for stat in user_stats:
             # The API returns 'username' not 'user' when using group_by=username
             username = stat.get('username')
             
             # Get user info if available
-            user_info = username_map.get(username, {})
+            user_info = username_map.get(username) or _EMPTY_USER
             
             sent = stat.get('sent', 0)
             delivered = stat.get('delivered', 0)
             failed = stat.get('failed', 0)
             
+            total_sent += sent
+            total_delivered += delivered
+            total_failed += failed
+            
             # Calculate delivery rate for this user
             user_delivery_rate = (delivered / sent * 100) if sent > 0 else 0
             
-            formatted_stats.append({
+            append({
                 'username': username,
-                'name': user_info.get('name', username),  # Use name if available, otherwise username
-                'email': user_info.get('email', ''),
+                'name': user_info.get('name') or username,  # Use name if available, otherwise username
+                'email': user_info.get('email') or '',
                 'sent': sent,
                 'delivered': delivered,
                 'failed': failed,
@@ -131,22 +201,48 @@ class DataProcessor:
         # Sort by number of emails sent (descending)
         formatted_stats.sort(key=lambda x: x['sent'], reverse=True)
         
-        # Create report data structure
-        report_data = {
-            'report_period': {
-                'start_date': start_date,
-                'end_date': end_date,
-                'formatted': f"{start_date.strftime('%B %d, %Y')} - {end_date.strftime('%B %d, %Y')}"
-            },
-            'summary': {
-                'total_sent': total_sent,
-                'total_delivered': total_delivered,
-                'total_failed': total_failed,
-                'delivery_rate': delivery_rate,
-                'total_users': len(formatted_stats)
-            },
-            'users': formatted_stats,
-            'generated_at': datetime.now()
-        }
+        return total_sent, total_delivered, total_failed, formatted_stats
+    
+    def _aggregate_user_stats_numpy(self, user_stats, username_map):
+        """Vectorized equivalent of _aggregate_user_stats for large user counts.
+        
+        Args:
+            user_stats (list): Per-user statistics from the API
+            username_map (dict): Mapping of usernames to SMTP user info
+            
+        Returns:
+            tuple: (total_sent, total_delivered, total_failed, formatted_stats)
+                with formatted_stats sorted by emails sent (descending)
+        """
+        count = len(user_stats)
+        sent = np.fromiter((stat.get('sent', 0) for stat in user_stats), dtype=np.int64, count=count)
+        delivered = np.fromiter((stat.get('delivered', 0) for stat in user_stats), dtype=np.int64, count=count)
+        failed = np.fromiter((stat.get('failed', 0) for stat in user_stats), dtype=np.int64, count=count)
+        
+        total_sent, total_delivered, total_failed, rates = _reduce_stats(sent, delivered, failed)
+        
+        # Sort by number of emails sent (descending). Negating the key with a
+        # stable sort keeps users with equal counts in their original order,
+        # matching list.sort(reverse=True).
+        order = np.argsort(-sent, kind='stable').tolist()
+        sent_list = sent.tolist()
+        delivered_list = delivered.tolist()
+        failed_list = failed.tolist()
+        rates_list = rates.tolist()
+        
+        formatted_stats = []
+        append = formatted_stats.append
+        for i in order:
+            username = user_stats[i].get('username')
+            user_info = username_map.get(username) or _EMPTY_USER
+            append({
+                'username': username,
+                'name': user_info.get('name') or username,
+                'email': user_info.get('email') or '',
+                'sent': sent_list[i],
+                'delivered': delivered_list[i],
+                'failed': failed_list[i],
+                'delivery_rate': rates_list[i]
+            })
         
-        return report_data
\ No newline at end of file
+        return total_sent, total_delivered, total_failed, formatted_stats
\ No newline at end of file
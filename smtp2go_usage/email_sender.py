@@ -3,19 +3,252 @@
 This module handles sending the generated PDF reports via email.
 """
 import os
+import re
+import ssl
+import uuid
+import base64
 import logging
 import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
-from email.mime.image import MIMEImage
+import functools
+from io import BytesIO
+from string import Template
+from email import policy
+from email.generator import BytesGenerator
+from email.message import EmailMessage
 
 logger = logging.getLogger(__name__)
 
+# Bytes of PDF encoded at a time when streaming an attachment; a multiple of
+# the 57 bytes that fill one 76-character base64 line, so encoded chunks can
+# simply be concatenated
+_ATTACHMENT_CHUNK_SIZE = 57 * 1024
+
+# Lines starting with a period are doubled during SMTP DATA (RFC 5321 4.5.2)
+_LEADING_PERIOD = re.compile(br'(?m)^\.')
+
+# HTML email body pieces, parsed once at import
+_HEADER_TMPL = Template("""
+        <html>
+        <head>
+            <style>
+                body { font-family: Arial, sans-serif; line-height: 1.6; }
+                h1 { color: #2c5aa0; }
+                h2 { color: #2c5aa0; }
+                table { border-collapse: collapse; width: 100%; }
+                th, td { padding: 8px; text-align: left; border-bottom: 1px solid #ddd; }
+                th { background-color: #4472C4; color: white; }
+                .summary { margin-bottom: 20px; }
+                .footer { font-size: small; color: #666; margin-top: 30px; }
+            </style>
+        </head>
+        <body>
+            <h1>SMTP2GO Monthly Usage Report</h1>
+            <p>Please find attached the SMTP2GO usage report for <strong>$period</strong>.</p>
+            
+            <div class="summary">
+                <h2>Summary</h2>
+                <ul>
+                    <li>Total Emails Sent: <strong>$total_sent</strong></li>
+                    <li>Total Emails Delivered: <strong>$total_delivered</strong></li>
+                    <li>Total Emails Failed: <strong>$total_failed</strong></li>
+                    <li>Overall Delivery Rate: <strong>$delivery_rate%</strong></li>
+                    <li>Total Users: <strong>$total_users</strong></li>
+                </ul>
+            </div>
+        """)
+
+_TABLE_HEADER = """
+            <h2>Top Users by Volume</h2>
+            <table>
+                <tr>
+                    <th>Username</th>
+                    <th>Emails Sent</th>
+                    <th>Delivery Rate</th>
+                </tr>
+            """
+
+_ROW_TMPL = Template("""
+                <tr>
+                    <td>$username</td>
+                    <td>$sent</td>
+                    <td>$delivery_rate%</td>
+                </tr>
+                """)
+
+_FOOTER = """
+            <div class="footer">
+                <p>This report was automatically generated by the SMTP2GO Monthly Usage Reporter. 
+                For detailed information, please see the attached PDF report.</p>
+            </div>
+        </body>
+        </html>
+        """
+
+def build_wire_bytes(msg):
+    """Serialize a message to the bytes sent over SMTP.
+    
+    The result can be passed to smtplib's sendmail any number of times
+    without walking the MIME tree or re-encoding attachments again.
+    
+    Args:
+        msg (email.message.Message): Message to serialize
+        
+    Returns:
+        bytes: The message with CRLF line endings
+    """
+    buffer = BytesIO()
+    generator = BytesGenerator(buffer, mangle_from_=False, policy=msg.policy.clone(linesep='\r\n'))
+    generator.flatten(msg)
+    return buffer.getvalue()
+
+def _rcpt_options(conn):
+    """Get the RCPT TO options to use on a connection.
+    
+    Per-recipient delivery status notifications are turned off when the
+    server supports DSN; the option is rejected by servers that do not.
+    smtplib already announces the message SIZE on servers that accept it.
+    
+    Args:
+        conn (smtplib.SMTP): Connected SMTP client
+        
+    Returns:
+        list: RCPT TO options
+    """
+    return ['NOTIFY=NEVER'] if conn.has_extn('dsn') else []
+
+def _body_cte(body):
+    """Choose the Content-Transfer-Encoding for an email body.
+    
+    Args:
+        body (str): Email body content
+        
+    Returns:
+        str: '7bit' if the body can be sent unencoded, otherwise
+            'quoted-printable'. The SMTP policy would otherwise pick 8bit,
+            which smtplib sends without asking the server for 8BITMIME.
+    """
+    if body.isascii() and all(len(line) <= 998 for line in body.splitlines()):
+        return '7bit'
+    return 'quoted-printable'
+
+@functools.lru_cache(maxsize=1)
+def _ssl_context():
+    """Get the TLS context shared by all SMTP connections.
+    
+    Building a context loads the system CA store, so it is done once per
+    process rather than on every connection.
+    
+    Returns:
+        ssl.SSLContext: Default client context with certificate verification
+    """
+    return ssl.create_default_context()
+
+def _encoded_file_chunks(path):
+    """Read a file and base64-encode it one chunk at a time.
+    
+    Args:
+        path (str): Path to the file
+        
+    Yields:
+        bytes: Encoded lines of at most 76 characters, each ending in CRLF
+    """
+    with open(path, 'rb') as f:
+        for chunk in iter(functools.partial(f.read, _ATTACHMENT_CHUNK_SIZE), b''):
+            yield base64.encodebytes(chunk).replace(b'\n', b'\r\n')
+
+def _streamed_pdf_parts(msg, pdf_path):
+    """Serialize a message around a PDF attachment that is encoded while sending.
+    
+    The attachment part gets a unique placeholder payload, and the serialized
+    message is split at it, so only the MIME structure is held in memory.
+    
+    Args:
+        msg (EmailMessage): Message to attach the PDF to
+        pdf_path (str): Path to the PDF file
+        
+    Returns:
+        tuple: (head, tail, encoded_size) where head and tail are the wire
+            bytes before and after the encoded PDF and encoded_size is the
+            number of bytes _encoded_file_chunks will produce
+    """
+    size = os.path.getsize(pdf_path)
+    placeholder = f"pdf-attachment-{uuid.uuid4().hex}"
+    
+    attachment = EmailMessage(policy=policy.SMTP)
+    attachment['Content-Type'] = 'application/pdf'
+    attachment['Content-Transfer-Encoding'] = 'base64'
+    attachment.set_payload(placeholder)
+    attachment.add_header('Content-Disposition', 'attachment', filename=os.path.basename(pdf_path))
+    msg.make_mixed()
+    msg.attach(attachment)
+    
+    head, tail = build_wire_bytes(msg).split(placeholder.encode('ascii') + b'\r\n')
+    # 4 characters per 3 bytes, plus CRLF after every line of 57 bytes
+    encoded_size = 4 * -(-size // 3) + 2 * -(-size // 57)
+    return head, tail, encoded_size
+
+def _sendmail_streamed(conn, from_addr, to_addrs, head, pdf_path, tail, size):
+    """Send a message whose PDF attachment is encoded from disk during DATA.
+    
+    smtplib's sendmail needs the whole message in memory, so this issues the
+    MAIL, RCPT and DATA commands itself and writes the encoded PDF chunk by
+    chunk, keeping memory use bounded by _ATTACHMENT_CHUNK_SIZE.
+    
+    Args:
+        conn (smtplib.SMTP): Connected SMTP client
+        from_addr (str): Envelope sender
+        to_addrs (list): Envelope recipients
+        head (bytes): Wire bytes before the encoded PDF
+        pdf_path (str): Path to the PDF file
+        tail (bytes): Wire bytes after the encoded PDF
+        size (int): Total message size announced to servers supporting SIZE
+        
+    Returns:
+        dict: Refused recipients, as returned by smtplib's sendmail
+    """
+    conn.ehlo_or_helo_if_needed()
+    mail_options = [f"SIZE={size}"] if conn.does_esmtp and conn.has_extn('size') else []
+    code, resp = conn.mail(from_addr, mail_options)
+    if code != 250:
+        raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+    
+    refused = {}
+    rcpt_options = _rcpt_options(conn)
+    for addr in to_addrs:
+        code, resp = conn.rcpt(addr, rcpt_options)
+        if code not in (250, 251):
+            refused[addr] = (code, resp)
+    if len(refused) == len(to_addrs):
+        raise smtplib.SMTPRecipientsRefused(refused)
+    
+    code, resp = conn.docmd('data')
+    if code != 354:
+        raise smtplib.SMTPDataError(code, resp)
+    
+    # Base64 lines never start with a period, so only the MIME structure
+    # around the attachment needs dot-stuffing
+    conn.send(_LEADING_PERIOD.sub(b'..', head))
+    for chunk in _encoded_file_chunks(pdf_path):
+        conn.send(chunk)
+    if not tail.endswith(b'\r\n'):
+        tail += b'\r\n'
+    conn.send(_LEADING_PERIOD.sub(b'..', tail) + b'.\r\n')
+    
+    code, resp = conn.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, resp)
+    return refused
+
 class EmailSender:
     """Send email reports using SMTP."""
     
-    def __init__(self, smtp_server, smtp_port, username, password, sender_email):
+    # Messages sent over one connection before it is replaced with a new one
+    MAX_MESSAGES_PER_CONNECTION = 100
+    
+    # Socket timeout in seconds for SMTP connections
+    SMTP_TIMEOUT = 30
+    
+    def __init__(self, smtp_server, smtp_port, username, password, sender_email, use_ssl=None):
         """Initialize the email sender.
         
         Args:
@@ -24,16 +257,158 @@ class EmailSender:
             username (str): SMTP authentication username
             password (str): SMTP authentication password
             sender_email (str): Sender's email address
+            use_ssl (bool, optional): Connect with implicit TLS instead of
+                STARTTLS. Defaults to True only for port 465.
         """
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
         self.username = username
         self.password = password
         self.sender_email = sender_email
+        self.use_ssl = smtp_port == 465 if use_ssl is None else use_ssl
+        
+        # Lazily opened SMTP connection reused across sends
+        self._smtp = None
+        self._messages_sent = 0
+    
+    def _get_conn(self):
+        """Get an authenticated SMTP connection, reusing the open one if alive.
+        
+        Returns:
+            smtplib.SMTP: Connected and logged-in SMTP client
+        """
+        if self._smtp is not None and self._messages_sent >= self.MAX_MESSAGES_PER_CONNECTION:
+            self.close()
+        
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._discard_conn()
+        
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port,
+                                    timeout=self.SMTP_TIMEOUT, context=_ssl_context())
+        else:
+            smtp = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.SMTP_TIMEOUT)
+        try:
+            smtp.ehlo()
+            if not self.use_ssl:
+                smtp.starttls(context=_ssl_context())
+                smtp.ehlo()
+            smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        
+        self._smtp = smtp
+        self._messages_sent = 0
+        return smtp
+    
+    def _discard_conn(self):
+        """Drop the current SMTP connection without a QUIT exchange."""
+        if self._smtp is not None:
+            self._smtp.close()
+            self._smtp = None
+    
+    def _reset_conn(self):
+        """Reset the SMTP transaction state after a failed send."""
+        if self._smtp is None:
+            return
+        
+        try:
+            self._smtp.rset()
+        except (smtplib.SMTPException, OSError):
+            self._discard_conn()
+    
+    def _deliver(self, send):
+        """Run a send over the connection, reconnecting once if the server dropped it.
+        
+        Args:
+            send (callable): Function taking the SMTP connection that sends one message
+        """
+        try:
+            send(self._get_conn())
+        except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError):
+            self._discard_conn()
+            send(self._get_conn())
+        self._messages_sent += 1
+    
+    def _send_message(self, msg, recipients=None):
+        """Send a message over the persistent connection.
+        
+        Args:
+            msg (email.message.Message): Message to send
+            recipients (list, optional): Envelope recipients. Taken from the
+                message headers if not provided.
+        """
+        self._deliver(lambda conn: conn.send_message(
+            msg, from_addr=self.sender_email, to_addrs=recipients,
+            rcpt_options=_rcpt_options(conn)
+        ))
+    
+    def close(self):
+        """Close the SMTP connection if one is open."""
+        if self._smtp is None:
+            return
+        
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        finally:
+            self._smtp = None
+    
+    def build_message(self, recipients, subject, body, pdf_path=None, pdf_bytes=None, pdf_filename=None):
+        """Build a report email with the PDF report attached.
+        
+        Args:
+            recipients (list): List of email addresses to send the report to,
+                or None to leave out the To header
+            subject (str): Email subject line
+            body (str): Email body content (HTML or plain text)
+            pdf_path (str, optional): Path to the PDF file to attach
+            pdf_bytes (bytes, optional): PDF content as bytes to attach
+            pdf_filename (str, optional): Filename to use when attaching pdf_bytes
+            
+        Returns:
+            EmailMessage: The message or None if the PDF could not be attached.
+                A PDF read from pdf_path is held in memory in full; send_report
+                and send_report_to_groups stream file attachments instead.
+        """
+        msg = EmailMessage(policy=policy.SMTP)
+        msg['From'] = self.sender_email
+        if recipients:
+            msg['To'] = ', '.join(recipients)
+        msg['Subject'] = subject
+        
+        # Set body. The generated HTML is normally plain ASCII, which can go
+        # out as 7bit without a quoted-printable or base64 encoding pass.
+        msg.set_content(body, subtype='html', cte=_body_cte(body))
+        
+        # Attach PDF
+        if pdf_path:
+            try:
+                with open(pdf_path, 'rb') as f:
+                    pdf_data = f.read()
+            except Exception as e:
+                logger.error(f"Failed to attach PDF file {pdf_path}: {e}")
+                return None
+            msg.add_attachment(pdf_data, maintype='application', subtype='pdf',
+                               filename=os.path.basename(pdf_path))
+        elif pdf_bytes and pdf_filename:
+            msg.add_attachment(pdf_bytes, maintype='application', subtype='pdf', filename=pdf_filename)
+        
+        return msg
     
     def send_report(self, recipients, subject, body, pdf_path=None, pdf_bytes=None, pdf_filename=None):
         """Send an email with the PDF report attached.
         
+        A PDF given by pdf_path is encoded from disk while it is sent, so it
+        is never held in memory in full.
+        
         Args:
             recipients (list): List of email addresses to send the report to
             subject (str): Email subject line
@@ -49,42 +424,161 @@ class EmailSender:
             logger.error("No recipients provided for email")
             return False
         
-        # Create multipart message
-        msg = MIMEMultipart()
-        msg['From'] = self.sender_email
-        msg['To'] = ', '.join(recipients)
-        msg['Subject'] = subject
+        if pdf_path:
+            msg = self.build_message(recipients, subject, body)
+            try:
+                head, tail, encoded_size = _streamed_pdf_parts(msg, pdf_path)
+            except OSError as e:
+                logger.error(f"Failed to attach PDF file {pdf_path}: {e}")
+                return False
+            
+            sent = self._send_streamed(recipients, head, pdf_path, tail, encoded_size)
+        else:
+            msg = self.build_message(recipients, subject, body, pdf_bytes=pdf_bytes, pdf_filename=pdf_filename)
+            
+            # Send email
+            try:
+                self._send_message(msg)
+                sent = True
+            except Exception as e:
+                logger.error(f"Failed to send email: {e}")
+                sent = False
         
-        # Attach body
-        msg.attach(MIMEText(body, 'html'))
+        if sent:
+            logger.info(f"Email sent successfully to {len(recipients)} recipients")
+        return sent
+    
+    def send_reports_batch(self, jobs):
+        """Send several prebuilt messages over a single SMTP connection.
+        
+        The connection is authenticated once for the whole batch, and a failed
+        message is reset with RSET so the rest of the batch can continue. Each
+        distinct message is serialized once, however many jobs share it.
+        
+        Args:
+            jobs (list): (recipients, message) tuples, where message is built
+                by build_message. Jobs whose message is None are not sent.
+                
+        Returns:
+            list: True or False for each job, indicating whether it was sent
+        """
+        results = []
+        # Serialized messages by identity, so a message shared between jobs
+        # is only encoded once
+        wire_cache = {}
+        
+        for recipients, msg in jobs:
+            if msg is None:
+                # build_message could not attach the PDF and has logged why
+                results.append(False)
+                continue
+            
+            wire_bytes = wire_cache.get(id(msg))
+            if wire_bytes is None:
+                wire_bytes = wire_cache[id(msg)] = build_wire_bytes(msg)
+            results.append(self._send_wire_bytes(recipients, wire_bytes))
+        
+        logger.info(f"Sent {sum(results)} of {len(results)} batched emails")
+        return results
+    
+    def send_report_to_groups(self, recipient_groups, subject, body, pdf_path=None, pdf_bytes=None, pdf_filename=None):
+        """Send the same report separately to several groups of recipients.
+        
+        The message is built and serialized once without a To header. Each
+        group's To header is folded on its own and prepended to those bytes,
+        so the body and PDF bytes are encoded only once. A PDF given by
+        pdf_path is streamed from disk for each group instead.
+        
+        Args:
+            recipient_groups (list): Lists of email addresses, one per email
+            subject (str): Email subject line
+            body (str): Email body content (HTML or plain text)
+            pdf_path (str, optional): Path to the PDF file to attach
+            pdf_bytes (bytes, optional): PDF content as bytes to attach
+            pdf_filename (str, optional): Filename to use when attaching pdf_bytes
+            
+        Returns:
+            list: True or False for each group, indicating whether it was sent
+        """
+        msg = self.build_message(None, subject, body, pdf_bytes=pdf_bytes, pdf_filename=pdf_filename)
+        
+        def to_header(recipients):
+            return msg.policy.fold_binary('To', ', '.join(recipients))
         
-        # Attach PDF
         if pdf_path:
-            pdf_filename = os.path.basename(pdf_path)
             try:
-                with open(pdf_path, 'rb') as f:
-                    attachment = MIMEApplication(f.read(), _subtype='pdf')
-                    attachment.add_header('Content-Disposition', 'attachment', filename=pdf_filename)
-                    msg.attach(attachment)
-            except Exception as e:
+                head, tail, encoded_size = _streamed_pdf_parts(msg, pdf_path)
+            except OSError as e:
                 logger.error(f"Failed to attach PDF file {pdf_path}: {e}")
-                return False
-        elif pdf_bytes and pdf_filename:
-            attachment = MIMEApplication(pdf_bytes, _subtype='pdf')
-            attachment.add_header('Content-Disposition', 'attachment', filename=pdf_filename)
-            msg.attach(attachment)
+                return [False] * len(recipient_groups)
+            
+            results = [
+                self._send_streamed(recipients, to_header(recipients) + head, pdf_path, tail, encoded_size)
+                for recipients in recipient_groups
+            ]
+        else:
+            wire_bytes = build_wire_bytes(msg)
+            results = [
+                self._send_wire_bytes(recipients, to_header(recipients) + wire_bytes)
+                for recipients in recipient_groups
+            ]
         
-        # Send email
-        try:
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.username, self.password)
-                server.send_message(msg)
+        logger.info(f"Sent report to {sum(results)} of {len(results)} recipient groups")
+        return results
+    
+    def _send_wire_bytes(self, recipients, wire_bytes):
+        """Send a serialized message, resetting the connection if it fails.
+        
+        Args:
+            recipients (list): Envelope recipients
+            wire_bytes (bytes): Message as built by build_wire_bytes
             
-            logger.info(f"Email sent successfully to {len(recipients)} recipients")
+        Returns:
+            bool: True if the message was sent, False otherwise
+        """
+        return self._try_deliver(recipients, lambda conn: conn.sendmail(
+            self.sender_email, recipients, wire_bytes,
+            rcpt_options=_rcpt_options(conn)
+        ))
+    
+    def _send_streamed(self, recipients, head, pdf_path, tail, encoded_size):
+        """Send a message with a streamed PDF, resetting the connection if it fails.
+        
+        Args:
+            recipients (list): Envelope recipients
+            head (bytes): Wire bytes before the encoded PDF
+            pdf_path (str): Path to the PDF file
+            tail (bytes): Wire bytes after the encoded PDF
+            encoded_size (int): Size of the encoded PDF in bytes
+            
+        Returns:
+            bool: True if the message was sent, False otherwise
+        """
+        size = len(head) + encoded_size + len(tail)
+        return self._try_deliver(recipients, lambda conn: _sendmail_streamed(
+            conn, self.sender_email, recipients, head, pdf_path, tail, size
+        ))
+    
+    def _try_deliver(self, recipients, send):
+        """Deliver one message, resetting the connection if it fails.
+        
+        Args:
+            recipients (list): Envelope recipients, for logging
+            send (callable): Function taking the SMTP connection that sends the message
+            
+        Returns:
+            bool: True if the message was sent, False otherwise
+        """
+        if not recipients:
+            logger.error("No recipients provided for email")
+            return False
+        
+        try:
+            self._deliver(send)
             return True
         except Exception as e:
-            logger.error(f"Failed to send email: {e}")
+            logger.error(f"Failed to send email to {', '.join(recipients)}: {e}")
+            self._reset_conn()
             return False
     
     def create_report_email_body(self, report_data):
@@ -100,71 +594,29 @@ class EmailSender:
         summary = report_data['summary']
         users = report_data['users']
         
-        # Create HTML email body
-        html = f"""
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; }}
-                h1 {{ color: #2c5aa0; }}
-                h2 {{ color: #2c5aa0; }}
-                table {{ border-collapse: collapse; width: 100%; }}
-                th, td {{ padding: 8px; text-align: left; border-bottom: 1px solid #ddd; }}
-                th {{ background-color: #4472C4; color: white; }}
-                .summary {{ margin-bottom: 20px; }}
-                .footer {{ font-size: small; color: #666; margin-top: 30px; }}
-            </style>
-        </head>
-        <body>
-            <h1>SMTP2GO Monthly Usage Report</h1>
-            <p>Please find attached the SMTP2GO usage report for <strong>{period}</strong>.</p>
-            
-            <div class="summary">
-                <h2>Summary</h2>
-                <ul>
-                    <li>Total Emails Sent: <strong>{summary['total_sent']:,}</strong></li>
-                    <li>Total Emails Delivered: <strong>{summary['total_delivered']:,}</strong></li>
-                    <li>Total Emails Failed: <strong>{summary['total_failed']:,}</strong></li>
-                    <li>Overall Delivery Rate: <strong>{summary['delivery_rate']:.2f}%</strong></li>
-                    <li>Total Users: <strong>{summary['total_users']}</strong></li>
-                </ul>
-            </div>
-        """
+        parts = [_HEADER_TMPL.substitute(
+            period=period,
+            total_sent=f"{summary['total_sent']:,}",
+            total_delivered=f"{summary['total_delivered']:,}",
+            total_failed=f"{summary['total_failed']:,}",
+            delivery_rate=f"{summary['delivery_rate']:.2f}",
+            total_users=summary['total_users']
+        )]
         
         # Add top 5 users table
-        top_users = users[:5] if len(users) > 5 else users
+        top_users = users[:5]
         
         if top_users:
-            html += """
-            <h2>Top Users by Volume</h2>
-            <table>
-                <tr>
-                    <th>Username</th>
-                    <th>Emails Sent</th>
-                    <th>Delivery Rate</th>
-                </tr>
-            """
-            
+            parts.append(_TABLE_HEADER)
             for user in top_users:
-                username = user.get('username', "Unknown")
-                html += f"""
-                <tr>
-                    <td>{username}</td>
-                    <td>{user['sent']:,}</td>
-                    <td>{user['delivery_rate']:.2f}%</td>
-                </tr>
-                """
-            
-            html += "</table>"
+                parts.append(_ROW_TMPL.substitute(
+                    username=user.get('username', "Unknown"),
+                    sent=f"{user['sent']:,}",
+                    delivery_rate=f"{user['delivery_rate']:.2f}"
+                ))
+            parts.append("</table>")
         
         # Add footer
-        html += """
-            <div class="footer">
-                <p>This report was automatically generated by the SMTP2GO Monthly Usage Reporter. 
-                For detailed information, please see the attached PDF report.</p>
-            </div>
-        </body>
-        </html>
-        """
+        parts.append(_FOOTER)
         
-        return html
\ No newline at end of file
+        return "".join(parts)
\ No newline at end of file
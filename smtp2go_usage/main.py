@@ -5,36 +5,55 @@ This module ties together all components and provides the CLI interface.
 """
 import os
 import sys
+import queue
+import atexit
 import logging
+import logging.handlers
 import datetime
 from pathlib import Path
 
 from smtp2go_usage.config import Config
-from smtp2go_usage.api_client import SMTP2GoClient
-from smtp2go_usage.data_processor import DataProcessor
-from smtp2go_usage.pdf_generator import PDFGenerator
-from smtp2go_usage.email_sender import EmailSender
 
-# Configure logging
+# The API client, data processor, PDF generator and email sender are imported
+# where they are used, so --help and configuration errors return quickly
+# without loading requests, NumPy or matplotlib
+
+# Configure logging. Records are handed to a queue and written to the console
+# and log file by a background thread, so log I/O never blocks the caller.
+# The queue handler only merges the message arguments; the full format is
+# applied by the output handlers.
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_log_handlers = [
+    logging.StreamHandler(),
+    logging.FileHandler(os.path.expanduser('~/smtp2go-usage.log'), delay=True)
+]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+
+_log_queue = queue.Queue(-1)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(os.path.expanduser('~/smtp2go-usage.log'))
-    ]
+    format='%(message)s',
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
+_log_listener = logging.handlers.QueueListener(_log_queue, *_log_handlers)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 
-# Set log level for specific modules to DEBUG
-logging.getLogger('smtp2go_usage.api_client').setLevel(logging.DEBUG)
-logging.getLogger('smtp2go_usage.data_processor').setLevel(logging.DEBUG)
-logging.getLogger('smtp2go_usage.pdf_generator').setLevel(logging.DEBUG)
-
-# Make sure the root logger shows DEBUG messages too
-logging.getLogger().setLevel(logging.DEBUG)
+# Modules whose DEBUG output is enabled by --verbose or SMTP2GO_DEBUG. Their
+# debug calls use %-style arguments so nothing is formatted when disabled.
+DEBUG_LOGGERS = (
+    'smtp2go_usage.api_client',
+    'smtp2go_usage.data_processor',
+    'smtp2go_usage.pdf_generator',
+)
 
 logger = logging.getLogger(__name__)
 
+# Largest PDF read into memory for attaching; bigger ones are streamed from
+# disk while the email is sent
+PDF_IN_MEMORY_LIMIT = 50 * 1024 * 1024
+
 def setup_config():
     """Set up and validate configuration.
     
@@ -45,6 +64,11 @@ def setup_config():
     parser = Config.setup_argparse()
     args = parser.parse_args()
     
+    # Only pay for debug logging when it is asked for
+    if args.verbose or os.environ.get("SMTP2GO_DEBUG"):
+        for name in DEBUG_LOGGERS:
+            logging.getLogger(name).setLevel(logging.DEBUG)
+    
     # Initialize configuration
     config = Config()
     
@@ -79,12 +103,20 @@ def generate_report(config):
         config (Config): Application configuration
         
     Returns:
-        tuple: (success, report_data, pdf_path)
+        tuple: (success, report_data, pdf_path, pdf_bytes) where pdf_bytes is
+            the content of the PDF, or None if it is too large to keep in memory
     """
+    from smtp2go_usage.api_client import SMTP2GoClient
+    from smtp2go_usage.data_processor import DataProcessor
+    from smtp2go_usage.pdf_generator import PDFGenerator
+    
+    # Initialize API client
+    api_client = SMTP2GoClient(
+        config.get("api_key"),
+        cache_dir=os.path.join(config.get("report_dir"), ".cache")
+    )
+    
     try:
-        # Initialize API client
-        api_client = SMTP2GoClient(config.get("api_key"))
-        
         # Initialize data processor
         data_processor = DataProcessor(api_client)
         
@@ -97,48 +129,58 @@ def generate_report(config):
             end_date=end_date,
             subaccounts=None  # Get all subaccounts
         )
-        
-        if not report_data:
-            logger.error("Failed to get report data")
-            return False, None, None
-        
-        # Initialize PDF generator
-        pdf_generator = PDFGenerator(config.get("report_dir"))
-        
-        # Generate PDF report
-        pdf_path = pdf_generator.generate_report(report_data)
-        
-        if not pdf_path:
-            logger.error("Failed to generate PDF report")
-            return False, report_data, None
-        
-        return True, report_data, pdf_path
+    finally:
+        # The API is not needed past this point
+        api_client.close()
+    
+    if not report_data:
+        logger.error("Failed to get report data")
+        return False, None, None, None
     
-    except Exception as e:
-        logger.error(f"Error generating report: {e}", exc_info=True)
-        return False, None, None
+    # Initialize PDF generator
+    pdf_generator = PDFGenerator(config.get("report_dir"))
+    
+    # Generate PDF report
+    pdf_path = pdf_generator.generate_report(report_data)
+    
+    if not pdf_path:
+        logger.error("Failed to generate PDF report")
+        return False, report_data, None, None
+    
+    # Read the PDF once here for the email attachment unless it is very large
+    pdf_bytes = None
+    if os.path.getsize(pdf_path) <= PDF_IN_MEMORY_LIMIT:
+        with open(pdf_path, 'rb') as f:
+            pdf_bytes = f.read()
+    
+    return True, report_data, pdf_path, pdf_bytes
 
-def send_report_email(config, report_data, pdf_path):
+def send_report_email(config, report_data, pdf_path, pdf_bytes=None):
     """Send the report via email.
     
     Args:
         config (Config): Application configuration
         report_data (dict): Processed report data
         pdf_path (str): Path to the generated PDF report
+        pdf_bytes (bytes, optional): Contents of the PDF report. When given,
+            they are attached directly; otherwise the PDF is streamed from
+            pdf_path.
         
     Returns:
         bool: True if email was sent successfully, False otherwise
     """
+    from smtp2go_usage.email_sender import EmailSender
+    
+    # Initialize email sender
+    email_sender = EmailSender(
+        smtp_server=config.get("smtp_server"),
+        smtp_port=config.get("smtp_port"),
+        username=config.get("smtp_username"),
+        password=config.get("smtp_password"),
+        sender_email=config.get("sender_email")
+    )
+    
     try:
-        # Initialize email sender
-        email_sender = EmailSender(
-            smtp_server=config.get("smtp_server"),
-            smtp_port=config.get("smtp_port"),
-            username=config.get("smtp_username"),
-            password=config.get("smtp_password"),
-            sender_email=config.get("sender_email")
-        )
-        
         # Create email body
         body = email_sender.create_report_email_body(report_data)
         
@@ -148,11 +190,13 @@ def send_report_email(config, report_data, pdf_path):
         
         # Send email
         recipients = config.get("report_recipients")
+        if pdf_bytes is not None:
+            return email_sender.send_report(recipients, subject, body,
+                                            pdf_bytes=pdf_bytes,
+                                            pdf_filename=os.path.basename(pdf_path))
         return email_sender.send_report(recipients, subject, body, pdf_path)
-    
-    except Exception as e:
-        logger.error(f"Error sending report email: {e}", exc_info=True)
-        return False
+    finally:
+        email_sender.close()
 
 def main():
     """Main entry point for the application."""
@@ -164,19 +208,23 @@ def main():
         logger.error("Failed to configure application. Exiting.")
         sys.exit(1)
     
-    # Generate report
-    success, report_data, pdf_path = generate_report(config)
-    if not success:
-        logger.error("Failed to generate report. Exiting.")
-        sys.exit(1)
-    
-    # Send report email
-    if success:
-        if send_report_email(config, report_data, pdf_path):
-            logger.info(f"Report email sent successfully to {config.get('report_recipients')}")
+    # Errors raised anywhere in the pipeline are logged once, here
+    try:
+        # Generate report
+        success, report_data, pdf_path, pdf_bytes = generate_report(config)
+        if not success:
+            logger.error("Failed to generate report. Exiting.")
+            sys.exit(1)
+        
+        # Send report email
+        if send_report_email(config, report_data, pdf_path, pdf_bytes):
+            logger.info(f"Report email sent successfully to {', '.join(config.get('report_recipients'))}")
         else:
             logger.error("Failed to send report email")
             sys.exit(1)
+    except Exception:
+        logger.exception("Report pipeline failed. Exiting.")
+        sys.exit(1)
     
     logger.info("SMTP2GO Monthly Usage Reporter completed successfully")
     return 0
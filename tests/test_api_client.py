@@ -1,10 +1,36 @@
 """Tests for the SMTP2GO API client."""
 
+import io
+import os
+import json
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 from datetime import datetime, timedelta
 
+from smtp2go_usage import api_client
 from smtp2go_usage.api_client import SMTP2GoClient
+from smtp2go_usage.data_processor import DataProcessor
+
+class _FakeResp:
+    """Minimal stand-in for a successful requests.Response."""
+    
+    __slots__ = ("_j",)
+    
+    status_code = 200
+    
+    def __init__(self, j):
+        self._j = j
+    
+    @property
+    def content(self):
+        return json.dumps(self._j).encode()
+    
+    def json(self):
+        return self._j
+    
+    def raise_for_status(self):
+        pass
 
 class TestSMTP2GoClient(unittest.TestCase):
     """Test cases for the SMTP2GO API client."""
@@ -20,69 +46,238 @@ class TestSMTP2GoClient(unittest.TestCase):
         self.assertEqual(self.client.headers["X-Smtp2go-Api-Key"], self.api_key)
         self.assertEqual(self.client.headers["Content-Type"], "application/json")
     
-    @patch("smtp2go_usage.api_client.requests.post")
-    def test_get_subaccounts(self, mock_post):
-        """Test retrieving subaccounts."""
-        # Mock response
-        mock_response = MagicMock()
-        mock_response.json.return_value = {
-            "data": {
-                "subaccounts": [
-                    {"id": "sub1", "name": "Subaccount 1"},
-                    {"id": "sub2", "name": "Subaccount 2"},
-                ]
-            }
-        }
-        mock_post.return_value = mock_response
+    def test_get_smtp_users_request(self):
+        """Test retrieving SMTP users through the client's session."""
+        users = [{"username": "user1"}, {"username": "user2", "name": "User 2"}]
         
-        # Call method
-        result = self.client.get_subaccounts()
+        with patch.object(self.client._session, "post",
+                          return_value=_FakeResp({"data": {"results": users}})) as mock_post:
+            result = self.client.get_smtp_users()
         
         # Assertions
         self.assertEqual(len(result), 2)
-        self.assertEqual(result[0]["id"], "sub1")
-        self.assertEqual(result[1]["name"], "Subaccount 2")
+        self.assertEqual(result[0]["username"], "user1")
+        self.assertEqual(result[1]["name"], "User 2")
         
         # Check request
         mock_post.assert_called_once_with(
-            f"{self.client.BASE_URL}/subaccounts/search",
-            headers=self.client.headers,
-            json={}
+            f"{self.client.BASE_URL}/users/smtp/view",
+            json={},
+            timeout=self.client.REQUEST_TIMEOUT
         )
     
-    @patch("smtp2go_usage.api_client.requests.post")
-    def test_get_email_history(self, mock_post):
-        """Test retrieving email history."""
-        # Mock response
-        mock_response = MagicMock()
-        mock_response.json.return_value = {
+    def test_get_email_history_by_user_request(self):
+        """Test retrieving email history through the client's session."""
+        response = _FakeResp({
             "data": {
-                "stats": [
-                    {"subaccount_id": "sub1", "sent": 100, "delivered": 95, "failed": 5},
-                    {"subaccount_id": "sub2", "sent": 200, "delivered": 190, "failed": 10},
+                "history": [
+                    {"username": "user1", "used": 100, "bounces": 3, "rejects": 2},
+                    {"username": "user2", "used": 200, "bounces": 10},
                 ]
             }
-        }
-        mock_post.return_value = mock_response
+        })
         
         # Test dates
         start_date = datetime(2025, 2, 1)
         end_date = datetime(2025, 2, 28)
         
-        # Call method
-        result = self.client.get_email_history(start_date, end_date, ["sub1", "sub2"])
+        with patch.object(api_client, "ijson", None), \
+                patch.object(self.client._session, "post", return_value=response) as mock_post:
+            result = self.client.get_email_history_by_user(start_date, end_date)
         
         # Assertions
         self.assertEqual(len(result["stats"]), 2)
-        self.assertEqual(result["stats"][0]["sent"], 100)
-        self.assertEqual(result["stats"][1]["delivered"], 190)
+        self.assertEqual(result["stats"][0]["delivered"], 95)
+        self.assertEqual(result["stats"][1]["failed"], 10)
         
         # Check request
         mock_post.assert_called_once()
         args, kwargs = mock_post.call_args
         self.assertEqual(args[0], f"{self.client.BASE_URL}/stats/email_history")
-        self.assertEqual(kwargs["headers"], self.client.headers)
-        self.assertEqual(kwargs["json"]["subaccounts"], ["sub1", "sub2"])
+        self.assertEqual(kwargs["json"], {
+            "group_by": "username",
+            "start_date": "2025-02-01T00:00:00",
+            "end_date": "2025-02-28T00:00:00"
+        })
+    
+    def test_make_request(self):
+        """Test that API responses are decoded through _parse."""
+        data = {"data": {"results": []}}
+        mock_response = _FakeResp(data)
+        
+        with patch.object(self.client._session, "post", return_value=mock_response) as mock_post, \
+                patch.object(SMTP2GoClient, "_parse", return_value=data) as mock_parse:
+            result = self.client._make_request(f"{self.client.BASE_URL}/users/smtp/view", {})
+        
+        self.assertEqual(result, data)
+        mock_parse.assert_called_once_with(mock_response)
+        mock_post.assert_called_once_with(
+            f"{self.client.BASE_URL}/users/smtp/view",
+            json={},
+            timeout=self.client.REQUEST_TIMEOUT
+        )
+    
+    def test_get_smtp_users(self):
+        """Test retrieving SMTP users from the supported response structures."""
+        users = [{"username": "user1"}, {"username": "user2"}]
+        
+        for response in ({"data": {"results": users}}, {"results": users}, {"data": {"users": users}}):
+            with patch.object(self.client, "_make_request", return_value=response):
+                self.assertEqual(self.client.get_smtp_users(), users)
+        
+        # An empty data.results does not fall through to the other structures
+        with patch.object(self.client, "_make_request",
+                          return_value={"data": {"results": [], "users": users}, "results": users}):
+            self.assertEqual(self.client.get_smtp_users(), [])
+        
+        with patch.object(self.client, "_make_request", return_value=None):
+            self.assertEqual(self.client.get_smtp_users(), [])
+    
+    def test_get_email_history_by_user(self):
+        """Test converting email history into per-user statistics."""
+        history = [
+            {"username": "user1", "used": 100, "bounces": 3, "rejects": 2},
+            {"username": "user2", "used": 50},
+        ]
+        expected = [
+            {"username": "user1", "sent": 100, "delivered": 95, "failed": 5},
+            {"username": "user2", "sent": 50, "delivered": 50, "failed": 0},
+        ]
+        start_date = datetime(2025, 2, 1)
+        end_date = datetime(2025, 2, 28)
+        
+        # Both the nested and the direct response structures are supported
+        for response in ({"data": {"history": history}}, {"history": history}):
+            with patch.object(api_client, "ijson", None), \
+                    patch.object(self.client, "_make_request", return_value=response):
+                result = self.client.get_email_history_by_user(start_date, end_date)
+            self.assertEqual(result, {"stats": expected})
+    
+    def _history_outcome(self, response, stream):
+        """Fetch email history for a response body through one of the parsing paths.
+        
+        Returns the result or the type of the exception raised, and the
+        client's INFO log output.
+        """
+        start_date = datetime(2025, 2, 1)
+        end_date = datetime(2025, 2, 28)
+        
+        with self.assertLogs(api_client.logger, level="INFO") as logs:
+            try:
+                if stream:
+                    mock_response = MagicMock(status_code=200, raw=io.BytesIO(json.dumps(response).encode()))
+                    with patch.object(self.client._session, "post") as mock_post:
+                        mock_post.return_value.__enter__.return_value = mock_response
+                        result = self.client.get_email_history_by_user(start_date, end_date)
+                    self.assertTrue(mock_post.call_args.kwargs["stream"])
+                else:
+                    with patch.object(api_client, "ijson", None), \
+                            patch.object(self.client._session, "post", return_value=_FakeResp(response)):
+                        result = self.client.get_email_history_by_user(start_date, end_date)
+            except Exception as e:
+                result = type(e)
+        return result, "\n".join(logs.output)
+    
+    @unittest.skipIf(api_client.ijson is None, "ijson is not installed")
+    def test_get_email_history_by_user_streaming(self):
+        """Test that streaming email history gives the same results as parsing it whole."""
+        history = [{"username": "user1", "used": 10, "bounces": 1, "rejects": 0}]
+        expected = {"stats": [{"username": "user1", "sent": 10, "delivered": 9, "failed": 1}]}
+        legacy = {"stats": [{"username": "user1", "sent": 5}]}
+        
+        cases = [
+            ({"data": {"history": history}}, expected),
+            ({"history": history}, expected),
+            # data.history is preferred over a top-level history list
+            ({"history": [], "data": {"history": history, "count": 1}}, expected),
+            ({"data": {"history": []}}, {"stats": []}),
+            # Without any history the data object is returned as before
+            ({"data": legacy}, legacy),
+            ({"data": None}, None),
+            ({}, {}),
+            # History that is not a list fails the same way on both paths
+            ({"data": {"history": {"username": "user1"}}}, AttributeError),
+            ({"data": {"history": 5}}, TypeError),
+        ]
+        for response, result in cases:
+            with self.subTest(response=response):
+                streamed, streamed_log = self._history_outcome(response, stream=True)
+                parsed, parsed_log = self._history_outcome(response, stream=False)
+                
+                self.assertEqual(streamed, result)
+                self.assertEqual(parsed, result)
+                # The response summary is logged on both paths
+                for log in (streamed_log, parsed_log):
+                    self.assertRegex(log, "API (returned|response keys)")
+    
+    def test_batch_report(self):
+        """Test fetching email history for several accounts concurrently."""
+        start_date = datetime(2025, 2, 1)
+        end_date = datetime(2025, 2, 28)
+        jobs = [(f"key{i}", start_date, end_date) for i in range(5)]
+        
+        def fake_history(client, start, end):
+            return {"stats": [{"username": client.api_key}]}
+        
+        with patch.object(SMTP2GoClient, "get_email_history_by_user", autospec=True,
+                          side_effect=fake_history):
+            results = SMTP2GoClient.batch_report(jobs, max_workers=3)
+        
+        # Results come back in job order, one client per API key
+        self.assertEqual([r["stats"][0]["username"] for r in results],
+                         [f"key{i}" for i in range(5)])
+    
+    def test_get_smtp_users_cache(self):
+        """Test that the SMTP user list is served from the disk cache."""
+        users = [{"username": "user1", "name": "User 1"}]
+        
+        with tempfile.TemporaryDirectory() as cache_dir:
+            client = SMTP2GoClient(self.api_key, cache_dir=cache_dir)
+            
+            with patch.object(client, "_fetch_smtp_users", return_value=users) as mock_fetch:
+                self.assertEqual(client.get_smtp_users(), users)
+                self.assertEqual(client.get_smtp_users(), users)
+            
+            # Only the first call should hit the API
+            mock_fetch.assert_called_once()
+            
+            # The API key must not be stored on disk
+            cache_files = os.listdir(cache_dir)
+            self.assertEqual(len(cache_files), 1)
+            self.assertNotIn(self.api_key, cache_files[0])
+    
+    def test_get_smtp_users_cache_expired(self):
+        """Test that an expired cache entry is refreshed from the API."""
+        users = [{"username": "user1", "name": "User 1"}]
+        
+        with tempfile.TemporaryDirectory() as cache_dir:
+            client = SMTP2GoClient(self.api_key, cache_dir=cache_dir)
+            with open(client._user_cache_path(), "w") as f:
+                json.dump({"timestamp": 0, "users": [{"username": "stale"}]}, f)
+            
+            with patch.object(client, "_fetch_smtp_users", return_value=users) as mock_fetch:
+                self.assertEqual(client.get_smtp_users(), users)
+            
+            mock_fetch.assert_called_once()
+    
+    def test_session_shared_between_threads(self):
+        """Test that the concurrent report calls reuse the client's one keep-alive session."""
+        responses = {
+            f"{self.client.BASE_URL}/users/smtp/view": {"data": {"results": [{"username": "user1"}]}},
+            f"{self.client.BASE_URL}/stats/email_history": {"data": {"history": [{"username": "user1", "used": 3}]}},
+        }
+        
+        with patch.object(api_client, "ijson", None), \
+                patch.object(self.client._session, "post",
+                             side_effect=lambda url, **kwargs: _FakeResp(responses[url])) as mock_post:
+            report = DataProcessor(self.client).get_monthly_report_data(datetime(2025, 2, 1), datetime(2025, 2, 28))
+        
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(report["summary"]["total_sent"], 3)
+        
+        with patch.object(self.client._session, "close") as mock_close:
+            self.client.close()
+        mock_close.assert_called_once()
     
     def test_get_previous_month_range(self):
         """Test calculating the previous month's date range."""
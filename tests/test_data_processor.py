@@ -0,0 +1,80 @@
+"""Tests for the SMTP2GO data processor."""
+
+import random
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from smtp2go_usage import data_processor
+from smtp2go_usage.data_processor import DataProcessor
+
+class TestDataProcessor(unittest.TestCase):
+    """Test cases for the data processor."""
+    
+    def setUp(self):
+        """Set up test case."""
+        self.processor = DataProcessor(MagicMock())
+        
+        # Enough users for the NumPy path, with tied sent counts, users that
+        # sent nothing, stats without a username and users missing from the
+        # SMTP user list
+        rng = random.Random(42)
+        self.user_stats = []
+        for i in range(data_processor._NUMPY_MIN_USERS * 2):
+            sent = rng.choice([0, 0, 5, 10, 10, 250, rng.randint(0, 1000)])
+            failed = rng.randint(0, sent)
+            stat = {"username": f"user{i}", "sent": sent, "delivered": sent - failed, "failed": failed}
+            if i % 50 == 0:
+                del stat["username"]
+            self.user_stats.append(stat)
+        
+        user_list = [{"username": f"user{i}", "name": f"User {i}", "email": f"user{i}@example.com"}
+                     for i in range(0, len(self.user_stats), 3)]
+        # Malformed users are skipped rather than mapped under None
+        user_list.append({"name": "No username", "email": "nobody@example.com"})
+        self.user_list = user_list
+        self.username_map = {user["username"]: user for user in user_list if "username" in user}
+    
+    def test_numpy_aggregation_matches_python(self):
+        """Test that the NumPy aggregation gives the same result as the Python one."""
+        self.assertGreater(len(self.user_stats), data_processor._NUMPY_MIN_USERS)
+        
+        expected = self.processor._aggregate_user_stats(self.user_stats, self.username_map)
+        result = self.processor._aggregate_user_stats_numpy(self.user_stats, self.username_map)
+        
+        # Totals
+        self.assertEqual(result[:3], expected[:3])
+        # Per-user stats, including rates of 0 where nothing was sent and the
+        # order of users with equal sent counts
+        self.assertEqual(result[3], expected[3])
+    
+    def test_process_user_report_data(self):
+        """Test building the report from many users through the NumPy path."""
+        start_date = datetime(2025, 2, 1)
+        end_date = datetime(2025, 2, 28)
+        
+        report = self.processor._process_user_report_data(
+            {"stats": self.user_stats}, self.user_list, start_date, end_date
+        )
+        
+        users = report["users"]
+        self.assertEqual(len(users), len(self.user_stats))
+        self.assertEqual(report["summary"]["total_sent"], sum(s["sent"] for s in self.user_stats))
+        self.assertEqual([u["sent"] for u in users], sorted((u["sent"] for u in users), reverse=True))
+        
+        by_username = {u["username"]: u for u in users}
+        # Known users get their name and email, others fall back to the username
+        self.assertEqual(by_username["user3"]["name"], "User 3")
+        self.assertEqual(by_username["user3"]["email"], "user3@example.com")
+        self.assertEqual(by_username["user1"]["name"], "user1")
+        self.assertEqual(by_username["user1"]["email"], "")
+        # Stats without a username are kept with empty user details
+        self.assertIsNone(by_username[None]["name"])
+        self.assertEqual(by_username[None]["email"], "")
+        
+        for user in users:
+            if user["sent"] == 0:
+                self.assertEqual(user["delivery_rate"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
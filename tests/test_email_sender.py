@@ -0,0 +1,293 @@
+"""Tests for the SMTP email sender."""
+
+import os
+import re
+import email
+import smtplib
+import tempfile
+import unittest
+from email import policy
+from unittest.mock import patch, MagicMock
+
+from smtp2go_usage.email_sender import EmailSender
+
+def _fake_conn():
+    """Create a stand-in for a connected smtplib.SMTP client."""
+    conn = MagicMock()
+    conn.noop.return_value = (250, b"OK")
+    conn.has_extn.return_value = False
+    return conn
+
+class TestEmailSender(unittest.TestCase):
+    """Test cases for the email sender's persistent SMTP connection."""
+    
+    def setUp(self):
+        """Set up test case."""
+        patcher = patch("smtp2go_usage.email_sender.smtplib.SMTP", side_effect=lambda *a, **kw: _fake_conn())
+        self.mock_smtp = patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        self.sender = EmailSender("smtp.example.com", 587, "user", "secret", "reports@example.com")
+        self.recipients = ("a@example.com",)
+    
+    def send(self):
+        """Send a small report and return the result."""
+        return self.sender.send_report(self.recipients, "Report", "<p>Report</p>")
+    
+    def test_connection_reused(self):
+        """Test that consecutive sends share one authenticated connection."""
+        self.assertTrue(self.send())
+        self.assertTrue(self.send())
+        
+        self.mock_smtp.assert_called_once()
+        conn = self.sender._smtp
+        conn.login.assert_called_once_with("user", "secret")
+        conn.starttls.assert_called_once()
+        # The reused connection is checked with NOOP before the second send
+        conn.noop.assert_called_once()
+        self.assertEqual(conn.send_message.call_count, 2)
+    
+    def test_reconnect_when_noop_fails(self):
+        """Test that a connection failing the NOOP check is replaced."""
+        self.send()
+        stale = self.sender._smtp
+        stale.noop.side_effect = smtplib.SMTPServerDisconnected()
+        
+        self.assertTrue(self.send())
+        
+        self.assertEqual(self.mock_smtp.call_count, 2)
+        stale.close.assert_called_once()
+        self.assertIsNot(self.sender._smtp, stale)
+        self.sender._smtp.send_message.assert_called_once()
+    
+    def test_retry_after_disconnect(self):
+        """Test that a send interrupted by a disconnect is retried once on a new connection."""
+        first = _fake_conn()
+        first.send_message.side_effect = smtplib.SMTPServerDisconnected()
+        second = _fake_conn()
+        self.mock_smtp.side_effect = [first, second]
+        
+        self.assertTrue(self.send())
+        
+        first.close.assert_called_once()
+        second.send_message.assert_called_once()
+        self.assertIs(self.sender._smtp, second)
+        self.assertEqual(self.sender._messages_sent, 1)
+    
+    def test_retry_only_once(self):
+        """Test that a second disconnect fails the send."""
+        conns = [_fake_conn(), _fake_conn()]
+        for conn in conns:
+            conn.send_message.side_effect = smtplib.SMTPServerDisconnected()
+        self.mock_smtp.side_effect = conns
+        
+        self.assertFalse(self.send())
+        self.assertEqual(self.mock_smtp.call_count, 2)
+    
+    def test_rotation(self):
+        """Test that the connection is replaced after MAX_MESSAGES_PER_CONNECTION sends."""
+        self.sender.MAX_MESSAGES_PER_CONNECTION = 2
+        
+        self.send()
+        first = self.sender._smtp
+        self.send()
+        self.send()
+        
+        self.assertEqual(self.mock_smtp.call_count, 2)
+        first.quit.assert_called_once()
+        self.assertEqual(first.send_message.call_count, 2)
+        self.sender._smtp.send_message.assert_called_once()
+    
+    def test_close(self):
+        """Test that close sends QUIT and forgets the connection."""
+        self.send()
+        conn = self.sender._smtp
+        
+        self.sender.close()
+        self.sender.close()
+        
+        conn.quit.assert_called_once()
+        self.assertIsNone(self.sender._smtp)
+    
+    def test_close_after_quit_fails(self):
+        """Test that the socket is closed when QUIT fails."""
+        self.send()
+        conn = self.sender._smtp
+        conn.quit.side_effect = smtplib.SMTPServerDisconnected()
+        
+        self.sender.close()
+        
+        conn.close.assert_called_once()
+        self.assertIsNone(self.sender._smtp)
+    
+    def test_ssl_on_port_465(self):
+        """Test that port 465 uses implicit TLS without STARTTLS."""
+        sender = EmailSender("smtp.example.com", 465, "user", "secret", "reports@example.com")
+        
+        with patch("smtp2go_usage.email_sender.smtplib.SMTP_SSL", return_value=_fake_conn()) as mock_ssl:
+            self.assertTrue(sender.send_report(self.recipients, "Report", "<p>Report</p>"))
+        
+        mock_ssl.assert_called_once()
+        self.mock_smtp.assert_not_called()
+        sender._smtp.starttls.assert_not_called()
+    
+    def test_batch_resets_after_failure(self):
+        """Test that a failed batch job is reset with RSET and the rest are still sent."""
+        msg = self.sender.build_message(self.recipients, "Report", "<p>Report</p>")
+        jobs = [(["a@example.com"], msg), (["bad@example.com"], msg), (["c@example.com"], msg)]
+        conn = _fake_conn()
+        conn.sendmail.side_effect = [
+            {},
+            smtplib.SMTPRecipientsRefused({"bad@example.com": (550, b"No such user")}),
+            {},
+        ]
+        self.mock_smtp.side_effect = [conn]
+        
+        self.assertEqual(self.sender.send_reports_batch(jobs), [True, False, True])
+        
+        # One authenticated connection serves the whole batch
+        conn.login.assert_called_once()
+        conn.rset.assert_called_once()
+        self.assertEqual([c.args[1] for c in conn.sendmail.call_args_list],
+                         [["a@example.com"], ["bad@example.com"], ["c@example.com"]])
+    
+    def test_batch_discards_connection_when_rset_fails(self):
+        """Test that a connection which cannot be reset is replaced for the next job."""
+        msg = self.sender.build_message(self.recipients, "Report", "<p>Report</p>")
+        first = _fake_conn()
+        first.sendmail.side_effect = smtplib.SMTPDataError(451, b"Try again")
+        first.rset.side_effect = smtplib.SMTPServerDisconnected()
+        second = _fake_conn()
+        self.mock_smtp.side_effect = [first, second]
+        
+        results = self.sender.send_reports_batch([(["a@example.com"], msg), (["b@example.com"], msg)])
+        
+        self.assertEqual(results, [False, True])
+        first.close.assert_called_once()
+        second.sendmail.assert_called_once()
+    
+    def test_batch_skips_unbuilt_messages(self):
+        """Test that a job without a message fails on its own without stopping the batch."""
+        msg = self.sender.build_message(self.recipients, "Report", "<p>Report</p>")
+        missing = self.sender.build_message(self.recipients, "Report", "<p>Report</p>",
+                                            pdf_path="/nonexistent/report.pdf")
+        self.assertIsNone(missing)
+        
+        results = self.sender.send_reports_batch([(["a@example.com"], msg), (["b@example.com"], missing),
+                                                  (["c@example.com"], msg)])
+        
+        self.assertEqual(results, [True, False, True])
+        self.assertEqual(self.sender._smtp.sendmail.call_count, 2)
+    
+    def test_dsn_disabled_when_supported(self):
+        """Test that NOTIFY=NEVER is sent only to servers advertising DSN."""
+        for has_dsn, rcpt_options in ((True, ["NOTIFY=NEVER"]), (False, [])):
+            conn = _fake_conn()
+            conn.has_extn.side_effect = lambda name: has_dsn and name.lower() == "dsn"
+            self.mock_smtp.side_effect = [conn]
+            self.sender.close()
+            
+            self.assertTrue(self.send())
+            msg = self.sender.build_message(self.recipients, "Report", "<p>Report</p>")
+            self.assertEqual(self.sender.send_reports_batch([(list(self.recipients), msg)]), [True])
+            
+            self.assertEqual(conn.send_message.call_args.kwargs["rcpt_options"], rcpt_options)
+            self.assertEqual(conn.sendmail.call_args.kwargs["rcpt_options"], rcpt_options)
+    
+    def test_send_report_to_groups(self):
+        """Test that each recipient group gets its own To header on the shared message."""
+        groups = [
+            ["a@example.com"],
+            [f"user{i}@example.com" for i in range(10)],
+        ]
+        
+        results = self.sender.send_report_to_groups(groups, "Report", "<p>Report</p>",
+                                                    pdf_bytes=b"%PDF-1.4", pdf_filename="report.pdf")
+        
+        self.assertEqual(results, [True, True])
+        conn = self.sender._smtp
+        # The long recipient list is folded onto continuation lines
+        self.assertIn(b",\r\n user", conn.sendmail.call_args_list[1].args[2])
+        self.assertEqual(conn.sendmail.call_count, 2)
+        for group, call in zip(groups, conn.sendmail.call_args_list):
+            sender, recipients, data = call.args
+            self.assertEqual(recipients, group)
+            self.assertTrue(data.startswith(b"To: "))
+            
+            msg = email.message_from_bytes(data, policy=policy.default)
+            self.assertEqual([address.addr_spec for address in msg["To"].addresses], group)
+            self.assertEqual(len(msg.get_all("To")), 1)
+            self.assertEqual(msg["From"], "reports@example.com")
+            self.assertEqual(msg["Subject"], "Report")
+            
+            attachment = next(msg.iter_attachments())
+            self.assertEqual(attachment.get_filename(), "report.pdf")
+            self.assertEqual(attachment.get_content(), b"%PDF-1.4")
+    
+    def test_body_transfer_encoding(self):
+        """Test that only ASCII bodies are sent unencoded."""
+        cases = (
+            ("<p>Report</p>", "7bit"),
+            ("<p>Grüße</p>", "quoted-printable"),
+            ("<p>" + "x" * 1000 + "</p>", "quoted-printable"),
+        )
+        for body, cte in cases:
+            msg = self.sender.build_message(self.recipients, "Report", body)
+            self.assertEqual(msg["Content-Transfer-Encoding"], cte)
+            self.assertEqual(msg.get_content().rstrip("\r\n"), body)
+    
+    def test_send_report_streams_pdf_from_disk(self):
+        """Test that a PDF file is encoded chunk by chunk while the message is sent."""
+        pdf_data = os.urandom(300 * 1024)
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+            f.write(pdf_data)
+        self.addCleanup(os.remove, f.name)
+        
+        conn = _fake_conn()
+        conn.has_extn.side_effect = lambda name: name == "size"
+        conn.mail.return_value = (250, b"OK")
+        conn.rcpt.return_value = (250, b"OK")
+        conn.docmd.return_value = (354, b"Go ahead")
+        conn.getreply.return_value = (250, b"Queued")
+        self.mock_smtp.side_effect = [conn]
+        
+        # A body line starting with a period must be dot-stuffed
+        body = "<p>Report</p>\n.hidden"
+        self.assertTrue(self.sender.send_report(self.recipients, "Report", body, pdf_path=f.name))
+        
+        conn.rcpt.assert_called_once_with("a@example.com", [])
+        conn.docmd.assert_called_once_with("data")
+        writes = [c.args[0] for c in conn.send.call_args_list]
+        # The PDF is never written in one piece
+        self.assertLess(max(len(w) for w in writes), len(pdf_data))
+        
+        data = b"".join(writes)
+        self.assertTrue(data.endswith(b"\r\n.\r\n"))
+        self.assertIn(b"\r\n..hidden", data)
+        wire = re.sub(rb"(?m)^\.\.", b".", data[:-3])
+        conn.mail.assert_called_once_with("reports@example.com", [f"SIZE={len(wire)}"])
+        
+        msg = email.message_from_bytes(wire, policy=policy.default)
+        self.assertEqual(msg["To"], "a@example.com")
+        self.assertIn(".hidden", msg.get_body().get_content())
+        attachment = next(msg.iter_attachments())
+        self.assertEqual(attachment.get_filename(), os.path.basename(f.name))
+        self.assertEqual(attachment.get_content(), pdf_data)
+    
+    def test_no_recipients(self):
+        """Test that sends without recipients fail without contacting the server."""
+        msg = self.sender.build_message(self.recipients, "Report", "<p>Report</p>")
+        
+        self.assertFalse(self.sender.send_report([], "Report", "<p>Report</p>"))
+        self.assertEqual(self.sender.send_reports_batch([([], msg)]), [False])
+        self.assertEqual(self.sender.send_report_to_groups([[]], "Report", "<p>Report</p>"), [False])
+        self.mock_smtp.assert_not_called()
+    
+    def test_send_report_missing_pdf(self):
+        """Test that a missing PDF file fails the send without contacting the server."""
+        self.assertFalse(self.sender.send_report(self.recipients, "Report", "<p>Report</p>",
+                                                 pdf_path="/nonexistent/report.pdf"))
+        self.mock_smtp.assert_not_called()
+
+if __name__ == "__main__":
+    unittest.main()